@@ -9,6 +9,8 @@ Implementation:
 - Use OnTheSnow resort pages and parse embedded JSON-LD (application/ld+json)
   which sometimes includes counts.
 - Also parse visible text fallbacks for lifts/trails/base depth when present.
+- All resorts are fetched concurrently (asyncio + httpx over HTTP/2) through one shared client;
+  Open-Meteo snowfall for every resort comes from a single multi-location request.
 
 Notes:
 - This is best-effort scraping. If OnTheSnow changes markup, we fail gracefully and keep nulls.
@@ -16,17 +18,54 @@ Notes:
 
 from __future__ import annotations
 
-import json
+import asyncio
+import hashlib
+import html
+import random
 import re
+import time
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Any, Optional, Tuple
-
-import requests
-from bs4 import BeautifulSoup
-
-
-@dataclass
+from pathlib import Path
+from typing import Any, Mapping, Optional, Sequence, Tuple
+
+import httpx
+import orjson
+
+# OnTheSnow pages are cached on disk. An entry younger than CACHE_TTL_S is used
+# without a request; older ones are revalidated with If-None-Match /
+# If-Modified-Since. In CI, .cache/ comes from a once-a-day actions/cache
+# snapshot that is usually past the TTL, so there the cache mostly just supplies
+# validators for conditional GETs.
+CACHE_DIR = Path(".cache/onthesnow")
+CACHE_TTL_S = 60 * 60
+
+# Transient failures (connection errors, timeouts, these statuses) are retried
+# with exponential backoff plus jitter.
+RETRY_ATTEMPTS = 4
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+RETRY_MAX_DELAY_S = 30.0
+
+# Raw-HTML scanners for OnTheSnow pages; cheaper than building a DOM. They run on
+# the undecoded response bytes.
+LD_JSON_RE = re.compile(
+    rb'<script[^>]+type=["\']application/ld\+json["\'][^>]*>(.*?)</script>',
+    re.DOTALL | re.IGNORECASE,
+)
+SCRIPT_STYLE_RE = re.compile(rb"<(script|style)\b[^>]*>.*?</\1>", re.DOTALL | re.IGNORECASE)
+TAG_RE = re.compile(rb"<[^>]+>")
+# Trails / lifts / base depth in one pass; m.lastgroup says which branch hit.
+# finditer matches can't overlap, so the base-depth gap excludes letters to keep
+# it from running into the next label (e.g. "Base Depth N/A Lifts 5/10").
+OPS_TEXT_RE = re.compile(
+    r"(?:Trails\s*(?:Open)?\s*(?P<to>\d{1,3})\s*/\s*(?P<tt>\d{1,3}))"
+    r"|(?:Lifts\s*(?:Open)?\s*(?P<lo>\d{1,3})\s*/\s*(?P<lt>\d{1,3}))"
+    r"|(?:base\s*depth[^\dA-Za-z]{0,20}(?P<bd>\d{1,3}))",
+    re.IGNORECASE,
+)
+
+
+@dataclass(frozen=True, slots=True)
 class Resort:
     name: str
     region: str
@@ -38,7 +77,7 @@ class Resort:
     onthesnow_url: str
 
 
-RESORTS = [
+RESORTS = (
     # Tahoe
     Resort(
         name="Palisades Tahoe",
@@ -202,29 +241,53 @@ RESORTS = [
         webcams_url="https://tellurideskiresort.com/mountain/webcams/",
         onthesnow_url="https://www.onthesnow.com/colorado/telluride/skireport",
     ),
-]
+)
 
 
 def _now_iso() -> str:
     return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
 
 
-def fetch_open_meteo_snow(lat: float, lon: float) -> Tuple[Optional[float], Optional[float]]:
-    url = "https://api.open-meteo.com/v1/forecast"
-    params = {
-        "latitude": str(lat),
-        "longitude": str(lon),
-        "hourly": "snowfall",
-        "past_days": "3",
-        "forecast_days": "1",
-        "timezone": "UTC",
-    }
-    r = requests.get(url, params=params, headers={"User-Agent": "tahoe-snow-report/1.0"}, timeout=30)
-    r.raise_for_status()
-    data = r.json()
+def _backoff_s(attempt: int, retry_after: Optional[str] = None) -> float:
+    delay = min(RETRY_MAX_DELAY_S, 2**attempt) * (0.5 + random.random())
+    if retry_after is not None and retry_after.isdigit():
+        delay = max(delay, float(retry_after))
+    return min(RETRY_MAX_DELAY_S, delay)
+
+
+async def _get(
+    client: httpx.AsyncClient,
+    url: str,
+    *,
+    params: Optional[Mapping[str, str]] = None,
+    headers: Optional[Mapping[str, str]] = None,
+) -> Tuple[int, Mapping[str, str], bytes]:
+    """GET with retries; returns (status, headers, body) or raises once attempts run out."""
+    for attempt in range(RETRY_ATTEMPTS - 1):
+        try:
+            r = await client.get(url, params=params, headers=headers)
+        except httpx.TransportError:
+            delay = _backoff_s(attempt)
+        else:
+            if r.status_code not in RETRY_STATUSES:
+                return _checked(r)
+            delay = _backoff_s(attempt, r.headers.get("Retry-After"))
+        await asyncio.sleep(delay)
+
+    # Final attempt: let whatever goes wrong propagate.
+    return _checked(await client.get(url, params=params, headers=headers))
 
-    times = data.get("hourly", {}).get("time", [])
-    snowfall_cm = data.get("hourly", {}).get("snowfall", [])
+
+def _checked(r: httpx.Response) -> Tuple[int, Mapping[str, str], bytes]:
+    # httpx.raise_for_status() also rejects 3xx, but a 304 is a valid answer here.
+    if r.is_error:
+        r.raise_for_status()
+    return r.status_code, r.headers, r.content
+
+
+def _snow_totals(location: dict[str, Any]) -> Tuple[Optional[float], Optional[float]]:
+    times = location.get("hourly", {}).get("time", [])
+    snowfall_cm = location.get("hourly", {}).get("snowfall", [])
     n = min(len(times), len(snowfall_cm))
     if n == 0:
         return None, None
@@ -241,14 +304,100 @@ def fetch_open_meteo_snow(lat: float, lon: float) -> Tuple[Optional[float], Opti
     return snow24, snow72
 
 
-def _parse_base_depth_in(text: str) -> Optional[int]:
-    m = re.search(r"base\s*depth[^\d]*(\d{1,3})\s*(in|\")?", text, re.IGNORECASE)
-    if m:
-        return int(m.group(1))
-    return None
+async def fetch_open_meteo_snow_batch(
+    client: httpx.AsyncClient, resorts: Sequence[Resort]
+) -> list[Tuple[Optional[float], Optional[float]]]:
+    """(snow24, snow72) per resort, in order, from a single multi-location request."""
+    url = "https://api.open-meteo.com/v1/forecast"
+    params = {
+        "latitude": ",".join(str(r.lat) for r in resorts),
+        "longitude": ",".join(str(r.lon) for r in resorts),
+        "hourly": "snowfall",
+        "past_days": "3",
+        "forecast_days": "1",
+        "timezone": "UTC",
+    }
+    _, _, body = await _get(client, url, params=params, headers={"User-Agent": "tahoe-snow-report/1.0"})
+    data = orjson.loads(body)
+
+    # Open-Meteo returns a list for several coordinates but a bare object for one.
+    locations = data if isinstance(data, list) else [data]
+    if len(locations) != len(resorts):
+        raise ValueError(f"Open-Meteo returned {len(locations)} locations for {len(resorts)} resorts")
+    return [_snow_totals(loc) for loc in locations]
+
+
+def _cache_paths(url: str) -> Tuple[Path, Path]:
+    key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    return CACHE_DIR / f"{key}.html", CACHE_DIR / f"{key}.json"
+
 
+def _read_cache(url: str) -> Optional[Tuple[dict[str, Any], bytes]]:
+    """Cached (meta, body) for url, stale or not; None if there is no usable entry."""
+    body_path, meta_path = _cache_paths(url)
+    try:
+        meta = orjson.loads(meta_path.read_bytes())
+        float(meta["fetched_at"])
+        return meta, body_path.read_bytes()
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
 
-def fetch_ops_from_onthesnow(onthesnow_url: str) -> dict[str, Optional[int]]:
+
+def _write_cache_meta(url: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+    _, meta_path = _cache_paths(url)
+    meta = {"url": url, "fetched_at": time.time(), "etag": etag, "last_modified": last_modified}
+    meta_path.write_bytes(orjson.dumps(meta))
+
+
+def _write_cache(url: str, body: bytes, etag: Optional[str], last_modified: Optional[str]) -> None:
+    body_path, _ = _cache_paths(url)
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    body_path.write_bytes(body)
+    _write_cache_meta(url, etag, last_modified)
+
+
+async def _fetch_onthesnow_page(client: httpx.AsyncClient, url: str) -> bytes:
+    cached = _read_cache(url)
+    if cached is not None and time.time() - float(cached[0]["fetched_at"]) < CACHE_TTL_S:
+        return cached[1]
+
+    headers = {
+        "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    }
+    # Stale entry: revalidate instead of re-downloading; an unchanged page comes back 304.
+    if cached is not None:
+        meta, _ = cached
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    status, resp_headers, page = await _get(client, url, headers=headers)
+    if status == 304 and cached is not None:
+        meta, page = cached
+        _write_cache_meta(
+            url,
+            resp_headers.get("ETag", meta.get("etag")),
+            resp_headers.get("Last-Modified", meta.get("last_modified")),
+        )
+        return page
+
+    _write_cache(url, page, resp_headers.get("ETag"), resp_headers.get("Last-Modified"))
+    return page
+
+
+def _unwrap_script_body(raw: bytes) -> bytes:
+    """Strip the <!-- --> / CDATA wrappers some pages put around script bodies."""
+    for start, end in ((b"<!--", b"-->"), (b"//<![CDATA[", b"//]]>"), (b"<![CDATA[", b"]]>")):
+        if raw.startswith(start) and raw.endswith(end):
+            raw = raw[len(start) : -len(end)].strip()
+    return raw
+
+
+async def fetch_ops_from_onthesnow(
+    client: httpx.AsyncClient, onthesnow_url: str
+) -> dict[str, Optional[int]]:
     """Best-effort parse lifts/trails/base depth from OnTheSnow skireport page."""
 
     out: dict[str, Optional[int]] = {
@@ -259,22 +408,16 @@ def fetch_ops_from_onthesnow(onthesnow_url: str) -> dict[str, Optional[int]]:
         "lifts_total": None,
     }
 
-    r = requests.get(
-        onthesnow_url,
-        headers={
-            "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        },
-        timeout=30,
-    )
-    r.raise_for_status()
-
-    soup = BeautifulSoup(r.text, "html.parser")
+    page = await _fetch_onthesnow_page(client, onthesnow_url)
 
     # 1) JSON-LD blocks
-    for tag in soup.select('script[type="application/ld+json"]'):
+    for m in LD_JSON_RE.finditer(page):
+        raw = _unwrap_script_body(m.group(1).strip())
+        # Anything that doesn't open like JSON isn't worth handing to the parser.
+        if raw[:1] not in (b"{", b"["):
+            continue
         try:
-            payload = json.loads(tag.get_text(strip=True))
+            payload = orjson.loads(raw)
         except Exception:
             continue
 
@@ -285,70 +428,103 @@ def fetch_ops_from_onthesnow(onthesnow_url: str) -> dict[str, Optional[int]]:
             if out["trails_total"] is None and isinstance(it.get("numberOfItems"), int):
                 out["trails_total"] = it["numberOfItems"]
 
-    # 2) Text-based fallbacks
-    text = soup.get_text(" ", strip=True)
-
-    m = re.search(r"Trails\s*(Open)?\s*(\d{1,3})\s*/\s*(\d{1,3})", text, re.IGNORECASE)
-    if m:
-        out["trails_open"] = int(m.group(2))
-        out["trails_total"] = int(m.group(3))
+    # 2) Text-based fallbacks (visible text only: drop scripts/styles, then tags)
+    # Only the tag-stripped remainder gets decoded, never the whole page.
+    visible = TAG_RE.sub(b" ", SCRIPT_STYLE_RE.sub(b" ", page))
+    # Collapse whitespace like get_text(" ", strip=True) did, so indentation and
+    # stripped tags don't count against the gaps the patterns allow.
+    text = " ".join(html.unescape(visible.decode("utf-8", errors="replace")).split())
+
+    found: set[str] = set()
+    for m in OPS_TEXT_RE.finditer(text):
+        kind = m.lastgroup
+        if kind in found:
+            continue
+        found.add(kind)
 
-    m = re.search(r"Lifts\s*(Open)?\s*(\d{1,3})\s*/\s*(\d{1,3})", text, re.IGNORECASE)
-    if m:
-        out["lifts_open"] = int(m.group(2))
-        out["lifts_total"] = int(m.group(3))
+        if kind == "tt":
+            out["trails_open"] = int(m.group("to"))
+            out["trails_total"] = int(m.group("tt"))
+        elif kind == "lt":
+            out["lifts_open"] = int(m.group("lo"))
+            out["lifts_total"] = int(m.group("lt"))
+        else:
+            out["base_depth_in"] = int(m.group("bd"))
 
-    bd = _parse_base_depth_in(text)
-    if bd is not None:
-        out["base_depth_in"] = bd
+        if len(found) == 3:
+            break
 
     return out
 
 
-def main() -> None:
-    resorts_out: list[dict[str, Any]] = []
+async def _fetch_ops_or_nulls(client: httpx.AsyncClient, onthesnow_url: str) -> dict[str, Optional[int]]:
+    try:
+        return await fetch_ops_from_onthesnow(client, onthesnow_url)
+    except Exception:
+        return {
+            "base_depth_in": None,
+            "trails_open": None,
+            "trails_total": None,
+            "lifts_open": None,
+            "lifts_total": None,
+        }
+
+
+def _resort_row(
+    r: Resort, snow: Tuple[Optional[float], Optional[float]], ops: dict[str, Optional[int]]
+) -> dict[str, Any]:
+    snow24, snow72 = snow
+    return {
+        "name": r.name,
+        "region": r.region,
+        "elevation_ft": r.elevation_ft,
+        "snow_24h_in": snow24,
+        "snow_72h_in": snow72,
+        "base_depth_in": ops.get("base_depth_in"),
+        "trails_open": ops.get("trails_open"),
+        "trails_total": ops.get("trails_total"),
+        "lifts_open": ops.get("lifts_open"),
+        "lifts_total": ops.get("lifts_total"),
+        "report_url": r.report_url,
+        "webcams_url": r.webcams_url,
+        "notes": "Snowfall from Open-Meteo (modeled). Ops stats best-effort from OnTheSnow skireport.",
+    }
 
-    for r in RESORTS:
-        snow24, snow72 = fetch_open_meteo_snow(r.lat, r.lon)
-        try:
-            ops = fetch_ops_from_onthesnow(r.onthesnow_url)
-        except Exception:
-            ops = {
-                "base_depth_in": None,
-                "trails_open": None,
-                "trails_total": None,
-                "lifts_open": None,
-                "lifts_total": None,
-            }
-
-        resorts_out.append(
-            {
-                "name": r.name,
-                "region": r.region,
-                "elevation_ft": r.elevation_ft,
-                "snow_24h_in": snow24,
-                "snow_72h_in": snow72,
-                "base_depth_in": ops.get("base_depth_in"),
-                "trails_open": ops.get("trails_open"),
-                "trails_total": ops.get("trails_total"),
-                "lifts_open": ops.get("lifts_open"),
-                "lifts_total": ops.get("lifts_total"),
-                "report_url": r.report_url,
-                "webcams_url": r.webcams_url,
-                "notes": "Snowfall from Open-Meteo (modeled). Ops stats best-effort from OnTheSnow skireport.",
-            }
+
+def _new_client() -> httpx.AsyncClient:
+    """One pooled HTTP/2 client for the whole run.
+
+    Every OnTheSnow page lives on www.onthesnow.com, so with HTTP/2 the
+    concurrent page fetches are multiplexed over a single TCP+TLS connection.
+    """
+    return httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=30),
+        timeout=httpx.Timeout(30),
+        follow_redirects=True,
+    )
+
+
+async def main() -> None:
+    # One Open-Meteo request for every resort, concurrently with the OnTheSnow pages.
+    async with _new_client() as client:
+        snow, *ops = await asyncio.gather(
+            fetch_open_meteo_snow_batch(client, RESORTS),
+            *[_fetch_ops_or_nulls(client, r.onthesnow_url) for r in RESORTS],
         )
 
+    resorts_out = [_resort_row(r, sn, op) for r, sn, op in zip(RESORTS, snow, ops)]
+
     out = {
         "updated_at": _now_iso(),
         "source": "Open-Meteo (modeled snowfall) + OnTheSnow (ops stats best-effort)",
         "resorts": resorts_out,
     }
 
-    with open("data/snow.json", "w", encoding="utf-8") as f:
-        json.dump(out, f, indent=2)
-        f.write("\n")
+    data = orjson.dumps(out, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+    with open("data/snow.json", "wb") as f:
+        f.write(data)
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())